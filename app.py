@@ -2,17 +2,26 @@
 アルバイト給料見込み計算アプリ
 
 必要なライブラリ:
-    pip install streamlit jpholiday
+    pip install streamlit jpholiday numpy pandas
+
+    （任意）numba をインストールすると給料計算がJITコンパイルされます:
+    pip install numba
 
 実行方法:
     streamlit run app.py
 """
 
+import numpy as np
+import pandas as pd
 import streamlit as st
-import jpholiday
 from datetime import datetime, date, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
 import re
 
+import holiday_lookup
+import wage_kernel
+
 
 # ===== 賃金設定 =====
 BASE_WAGE = 1140        # 基本時給
@@ -20,32 +29,27 @@ WEEKEND_WAGE = 1290     # 土日祝日時給
 WEEKDAY_AFTERNOON = 1190  # 平日13:00〜17:00
 WEEKDAY_EVENING = 1290    # 平日17:00以降
 
+# 平日の時間帯の境界（0:00からの分）
+_MORNING_END = 780      # 13:00まで（基本時給）
+_AFTERNOON_END = 1020   # 17:00まで（1190円）
+_DAY_END = 1440         # 24:00
 
-def is_holiday_or_weekend(target_date: date) -> bool:
-    """土日祝日かどうかを判定する"""
-    # 土曜(5) または 日曜(6)
-    if target_date.weekday() >= 5:
-        return True
-    # 祝日判定
-    if jpholiday.is_holiday(target_date):
-        return True
-    return False
-
-
-def parse_time(time_str: str) -> tuple[int, int]:
-    """時刻文字列をパースして (時, 分) を返す"""
-    parts = time_str.split(":")
-    return int(parts[0]), int(parts[1])
+# date.weekday() の値に対応する曜日名
+_WEEKDAY_NAMES = ("月", "火", "水", "木", "金", "土", "日")
 
+# ===== シフト表パターン =====
+# 日付パターン: MM/DD(曜日) または M/D(曜日)
+_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})\([^)]+\)")
+# 勤務時間パターン: HH:MM～HH:MM または HH:MM〜HH:MM
+_TIME_RE = re.compile(r"(\d{1,2}:\d{2})[～〜](\d{1,2}:\d{2})")
 
-def time_to_minutes(hour: int, minute: int) -> int:
-    """時:分 を分に変換"""
-    return hour * 60 + minute
 
-
-def minutes_to_hours(minutes: int) -> float:
-    """分を時間（小数）に変換"""
-    return minutes / 60
+def _hhmm_to_min(time_str: str) -> int:
+    """ゼロ埋め済みの "HH:MM" 形式の時刻文字列を分に変換"""
+    return (
+        int(time_str[0]) * 600 + int(time_str[1]) * 60
+        + int(time_str[3]) * 10 + int(time_str[4])
+    )
 
 
 def calculate_overlap(start1: int, end1: int, start2: int, end2: int) -> int:
@@ -55,121 +59,129 @@ def calculate_overlap(start1: int, end1: int, start2: int, end2: int) -> int:
     return max(0, overlap_end - overlap_start)
 
 
-def calculate_daily_wage(work_date: date, start_time: str, end_time: str) -> dict:
+def compute_wages(shifts: SimpleNamespace) -> None:
     """
-    1日の給料を計算する
+    全シフトの給料をまとめて計算する
     
-    Returns:
-        dict: 計算結果（時間帯別の内訳と合計）
+    parse_shift_text の結果に以下の配列を追加する:
+        is_special: 土日祝日かどうか
+        holiday_names: 祝日名（祝日でなければ None）のリスト
+        morning / afternoon / evening: 平日の時間帯別の勤務時間（分）
+        total_minutes: 勤務時間（分）
+        wages: 給料
     """
-    start_h, start_m = parse_time(start_time)
-    end_h, end_m = parse_time(end_time)
+    starts = shifts.starts
+    ends = shifts.ends
+    # 土日祝判定と祝日名を1回の走査でまとめて取得
+    holiday_info = [
+        holiday_lookup.is_holiday_or_weekend(d.toordinal()) for d in shifts.dates
+    ]
+    is_special = np.fromiter(
+        (special for special, _ in holiday_info), dtype=bool, count=len(holiday_info)
+    )
     
-    start_minutes = time_to_minutes(start_h, start_m)
-    end_minutes = time_to_minutes(end_h, end_m)
+    total_minutes = ends - starts
     
-    total_minutes = end_minutes - start_minutes
+    # 時間帯別の分数と給料は wage_kernel のループで計算する（numba があればコンパイル済み）
+    n = starts.size
+    morning = np.empty(n, dtype=np.int32)
+    afternoon = np.empty(n, dtype=np.int32)
+    evening = np.empty(n, dtype=np.int32)
+    wages = np.empty(n, dtype=np.int32)
+    wage_kernel.get_kernel()(
+        starts, ends, is_special,
+        (_MORNING_END, _AFTERNOON_END, _DAY_END),
+        (BASE_WAGE, WEEKDAY_AFTERNOON, WEEKDAY_EVENING, WEEKEND_WAGE),
+        wages, morning, afternoon, evening,
+    )
     
-    result = {
-        "date": work_date,
-        "start": start_time,
-        "end": end_time,
-        "total_minutes": total_minutes,
-        "wage": 0,
-        "breakdown": []
-    }
+    shifts.is_special = is_special
+    shifts.holiday_names = [name for _, name in holiday_info]
+    shifts.morning = morning
+    shifts.afternoon = afternoon
+    shifts.evening = evening
+    shifts.total_minutes = total_minutes
+    shifts.wages = wages
+
+
+def shift_breakdown(shifts: SimpleNamespace, i: int) -> tuple[dict, ...]:
+    """
+    compute_wages 済みのシフトから i 番目の時間帯別内訳を組み立てる
     
-    # 土日祝日の場合
-    if is_holiday_or_weekend(work_date):
-        wage = minutes_to_hours(total_minutes) * WEEKEND_WAGE
-        result["wage"] = wage
-        result["breakdown"].append({
+    Returns:
+        tuple: 時間帯ごとの内訳（種別、分数、時給、金額）
+    """
+    # 土日祝日は常に1件なので、計算済みの給料をそのまま使って返す
+    if shifts.is_special[i]:
+        return ({
             "type": "土日祝",
-            "minutes": total_minutes,
+            "minutes": int(shifts.total_minutes[i]),
             "rate": WEEKEND_WAGE,
-            "amount": wage
-        })
-        return result
+            "amount": int(shifts.wages[i])
+        },)
     
-    # 平日の場合 - 時間帯別に計算
-    # 時間帯定義（分単位）
-    MORNING_END = time_to_minutes(13, 0)      # 13:00まで（基本時給）
-    AFTERNOON_END = time_to_minutes(17, 0)    # 17:00まで（1190円）
-    
-    wage = 0
-    
-    # 13:00より前（基本時給）
-    morning_minutes = calculate_overlap(start_minutes, end_minutes, 0, MORNING_END)
-    if morning_minutes > 0:
-        morning_wage = minutes_to_hours(morning_minutes) * BASE_WAGE
-        wage += morning_wage
-        result["breakdown"].append({
-            "type": "〜13:00",
-            "minutes": morning_minutes,
-            "rate": BASE_WAGE,
-            "amount": morning_wage
-        })
-    
-    # 13:00〜17:00（1190円）
-    afternoon_minutes = calculate_overlap(start_minutes, end_minutes, MORNING_END, AFTERNOON_END)
-    if afternoon_minutes > 0:
-        afternoon_wage = minutes_to_hours(afternoon_minutes) * WEEKDAY_AFTERNOON
-        wage += afternoon_wage
-        result["breakdown"].append({
-            "type": "13:00〜17:00",
-            "minutes": afternoon_minutes,
-            "rate": WEEKDAY_AFTERNOON,
-            "amount": afternoon_wage
-        })
-    
-    # 17:00以降（1290円）
-    evening_minutes = calculate_overlap(start_minutes, end_minutes, AFTERNOON_END, time_to_minutes(24, 0))
-    if evening_minutes > 0:
-        evening_wage = minutes_to_hours(evening_minutes) * WEEKDAY_EVENING
-        wage += evening_wage
-        result["breakdown"].append({
-            "type": "17:00〜",
-            "minutes": evening_minutes,
-            "rate": WEEKDAY_EVENING,
-            "amount": evening_wage
-        })
-    
-    result["wage"] = wage
-    return result
+    bands = (
+        ("〜13:00", int(shifts.morning[i]), BASE_WAGE),
+        ("13:00〜17:00", int(shifts.afternoon[i]), WEEKDAY_AFTERNOON),
+        ("17:00〜", int(shifts.evening[i]), WEEKDAY_EVENING),
+    )
+    breakdown = [
+        {
+            "type": band_type,
+            "minutes": minutes,
+            "rate": rate,
+            "amount": minutes * rate // 60
+        }
+        for band_type, minutes, rate in bands
+        if minutes > 0
+    ]
+    # 切り捨ての端数は最後の時間帯に寄せ、内訳の合計を1日の給料と一致させる
+    if breakdown:
+        breakdown[-1]["amount"] = int(shifts.wages[i]) - sum(
+            b["amount"] for b in breakdown[:-1]
+        )
+    return tuple(breakdown)
 
 
-def parse_shift_text(text: str) -> list[dict]:
+@st.cache_data(show_spinner=False, max_entries=32)
+def parse_shift_text(text: str, current_year: int, current_month: int) -> SimpleNamespace:
     """
     シフト表テキストをパースする
     
+    年の補完に使う現在の年月は引数で受け取る（キャッシュのキーに含めるため）
+    
     Returns:
-        list: 各勤務日の情報リスト
+        SimpleNamespace: 各勤務日の情報を列ごとに持つ
+            dates: 勤務日のリスト
+            start_times / end_times: "HH:MM" 形式の開始・終了時刻のリスト
+            starts / ends: 開始・終了時刻（0:00からの分）の配列
     """
-    lines = text.strip().split("\n")
-    shifts = []
-    
-    # 現在の年を取得（年をまたぐ場合の処理用）
-    current_year = datetime.now().year
-    current_month = datetime.now().month
+    lines = text.splitlines()
+    dates = []
+    start_times = []
+    end_times = []
     
     for line in lines:
-        # 空行やヘッダー行をスキップ
-        if not line.strip():
+        # 空行やヘッダー行をスキップ（以降の判定は前後の空白を除いた行で行う）
+        if not (stripped := line.strip()):
             continue
-        if "日付" in line and "勤務時間" in line:
+        if "日付" in stripped and "勤務時間" in stripped:
             continue
         
-        # 「－」「ー」を含む行は勤務なしとしてスキップ
-        if "－" in line or "ー" in line:
+        # 日付の「/」と時刻の「:」がない行は正規表現にかけずに除外
+        if "/" not in stripped or ":" not in stripped:
             continue
         
-        # 日付パターン: MM/DD(曜日) または M/D(曜日)
-        date_pattern = r"(\d{1,2})/(\d{1,2})\([^)]+\)"
-        date_match = re.search(date_pattern, line)
+        # 日付のない行は先に除外し、以降の判定を行わない
+        date_match = _DATE_RE.search(stripped)
         
         if not date_match:
             continue
         
+        # 「－」「ー」を含む行は勤務なしとしてスキップ
+        if "－" in stripped or "ー" in stripped:
+            continue
+        
         month = int(date_match.group(1))
         day = int(date_match.group(2))
         
@@ -185,9 +197,7 @@ def parse_shift_text(text: str) -> list[dict]:
         except ValueError:
             continue
         
-        # 勤務時間パターン: HH:MM～HH:MM または HH:MM〜HH:MM
-        time_pattern = r"(\d{1,2}:\d{2})[～〜](\d{1,2}:\d{2})"
-        time_match = re.search(time_pattern, line)
+        time_match = _TIME_RE.search(stripped)
         
         if not time_match:
             continue
@@ -201,15 +211,25 @@ def parse_shift_text(text: str) -> list[dict]:
         start_time = f"{int(start_parts[0]):02d}:{start_parts[1]}"
         end_time = f"{int(end_parts[0]):02d}:{end_parts[1]}"
         
-        shifts.append({
-            "date": work_date,
-            "start": start_time,
-            "end": end_time
-        })
+        dates.append(work_date)
+        start_times.append(start_time)
+        end_times.append(end_time)
     
-    return shifts
+    n = len(dates)
+    return SimpleNamespace(
+        dates=dates,
+        start_times=start_times,
+        end_times=end_times,
+        starts=np.fromiter(
+            (_hhmm_to_min(t) for t in start_times), dtype=np.int32, count=n
+        ),
+        ends=np.fromiter(
+            (_hhmm_to_min(t) for t in end_times), dtype=np.int32, count=n
+        ),
+    )
 
 
+@lru_cache(maxsize=256)
 def format_minutes(minutes: int) -> str:
     """分を「○時間○分」形式にフォーマット"""
     hours = minutes // 60
@@ -219,6 +239,108 @@ def format_minutes(minutes: int) -> str:
     return f"{hours}時間{mins}分"
 
 
+@st.fragment
+def _render_results():
+    """計算結果を表示する（フラグメントとして単独で再実行される）"""
+    shifts = st.session_state["shifts"]
+    total_wage = int(shifts.wages.sum())
+    total_minutes = int(shifts.total_minutes.sum())
+    
+    # 平日で時間帯をまたぐシフト（詳細内訳を表示する行）
+    band_counts = (
+        (shifts.morning > 0).astype(int)
+        + (shifts.afternoon > 0)
+        + (shifts.evening > 0)
+    )
+    show_breakdown = ~shifts.is_special & (band_counts > 1)
+    
+    # 結果表示
+    st.markdown("---")
+    st.subheader("📊 計算結果")
+    
+    # 各日の内訳
+    st.markdown("#### 日別内訳")
+    
+    # 日付順の並び（入力が既に日付順なら並べ替えない）
+    dates_ord = np.fromiter(
+        (d.toordinal() for d in shifts.dates), dtype=np.int32, count=len(shifts.dates)
+    )
+    if (np.diff(dates_ord) >= 0).all():
+        order = range(dates_ord.size)
+    else:
+        order = np.argsort(dates_ord, kind="stable")
+    
+    rows = {"日付": [], "勤務時間": [], "内訳": [], "給与": []}
+    for i in order:
+        work_date = shifts.dates[i]
+        weekday = _WEEKDAY_NAMES[work_date.weekday()]
+        
+        # 土日祝判定（compute_wages で取得済みの結果を使う）
+        holiday_name = shifts.holiday_names[i]
+        
+        date_str = f"{work_date.month}/{work_date.day}({weekday})"
+        if holiday_name:
+            date_str += f" 🎌{holiday_name}"
+        elif shifts.is_special[i]:
+            date_str += " 🗓️"
+        
+        # 詳細内訳（平日で時間帯をまたぐ場合のみ組み立てる）
+        detail_text = ""
+        if show_breakdown[i]:
+            detail_text = " / ".join([
+                f"{b['type']}: {format_minutes(b['minutes'])}×{b['rate']:,}円"
+                for b in shift_breakdown(shifts, i)
+            ])
+        
+        rows["日付"].append(date_str)
+        rows["勤務時間"].append(f"{shifts.start_times[i]}〜{shifts.end_times[i]}")
+        rows["内訳"].append(detail_text)
+        rows["給与"].append(int(shifts.wages[i]))
+    
+    st.dataframe(
+        pd.DataFrame(rows),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "内訳": st.column_config.TextColumn("内訳", width="large"),
+            "給与": st.column_config.NumberColumn("給与（円）", format="localized"),
+        },
+    )
+    
+    # 時間帯別の内訳（チェック時のみ組み立てて表示）
+    if st.checkbox("時間帯別の内訳を表示", key="show_band_breakdown"):
+        band_rows = {"日付": [], "時間帯": [], "時間": [], "時給": [], "金額": []}
+        for date_str, i in zip(rows["日付"], order):
+            for b in shift_breakdown(shifts, i):
+                band_rows["日付"].append(date_str)
+                band_rows["時間帯"].append(b["type"])
+                band_rows["時間"].append(format_minutes(b["minutes"]))
+                band_rows["時給"].append(b["rate"])
+                band_rows["金額"].append(b["amount"])
+        st.dataframe(
+            pd.DataFrame(band_rows),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "時給": st.column_config.NumberColumn("時給（円）", format="localized"),
+                "金額": st.column_config.NumberColumn("金額（円）", format="localized"),
+            },
+        )
+    
+    # 合計
+    st.markdown("---")
+    st.subheader("📈 合計")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("合計勤務時間", format_minutes(total_minutes))
+    with col2:
+        st.metric("月給見込み額", f"{total_wage:,}円")
+    
+    # 勤務日数
+    st.info(f"📅 勤務日数: {len(shifts.dates)}日")
+
+
 def main():
     """メインアプリケーション"""
     st.set_page_config(
@@ -264,78 +386,27 @@ def main():
     # 計算ボタン
     if st.button("🧮 計算する", type="primary", use_container_width=True):
         if not shift_text.strip():
+            st.session_state.pop("shifts", None)
             st.warning("シフト表を入力してください。")
             return
         
-        # パース
-        shifts = parse_shift_text(shift_text)
+        # パース（年をまたぐ場合の処理用に現在の年月を渡す）
+        now = datetime.now()
+        shifts = parse_shift_text(shift_text, now.year, now.month)
         
-        if not shifts:
+        if not shifts.dates:
+            st.session_state.pop("shifts", None)
             st.error("有効なシフトデータが見つかりませんでした。フォーマットを確認してください。")
             return
         
-        # 計算
-        results = []
-        total_wage = 0
-        total_minutes = 0
-        
-        for shift in shifts:
-            result = calculate_daily_wage(shift["date"], shift["start"], shift["end"])
-            results.append(result)
-            total_wage += result["wage"]
-            total_minutes += result["total_minutes"]
-        
-        # 結果表示
-        st.markdown("---")
-        st.subheader("📊 計算結果")
-        
-        # 各日の内訳
-        st.markdown("#### 日別内訳")
-        
-        for result in sorted(results, key=lambda x: x["date"]):
-            work_date = result["date"]
-            weekday_names = ["月", "火", "水", "木", "金", "土", "日"]
-            weekday = weekday_names[work_date.weekday()]
-            
-            # 土日祝判定
-            is_special = is_holiday_or_weekend(work_date)
-            holiday_name = jpholiday.is_holiday_name(work_date)
-            
-            date_str = f"{work_date.month}/{work_date.day}({weekday})"
-            if holiday_name:
-                date_str += f" 🎌{holiday_name}"
-            elif is_special:
-                date_str += " 🗓️"
-            
-            with st.container():
-                col1, col2, col3 = st.columns([2, 2, 1])
-                with col1:
-                    st.write(f"**{date_str}**")
-                with col2:
-                    st.write(f"{result['start']}〜{result['end']}")
-                with col3:
-                    st.write(f"**{result['wage']:,.0f}円**")
-                
-                # 詳細内訳（平日で時間帯をまたぐ場合）
-                if len(result["breakdown"]) > 1:
-                    detail_text = " / ".join([
-                        f"{b['type']}: {format_minutes(b['minutes'])}×{b['rate']:,}円"
-                        for b in result["breakdown"]
-                    ])
-                    st.caption(f"　　{detail_text}")
-        
-        # 合計
-        st.markdown("---")
-        st.subheader("📈 合計")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("合計勤務時間", format_minutes(total_minutes))
-        with col2:
-            st.metric("月給見込み額", f"{total_wage:,.0f}円")
-        
-        # 勤務日数
-        st.info(f"📅 勤務日数: {len(results)}日")
+        # 計算（結果はセッションに保存し、表示はフラグメントで行う）
+        compute_wages(shifts)
+        st.session_state["shifts"] = shifts
+        st.session_state["shifts_text"] = shift_text
+    
+    # 結果は計算元のテキストから変わっていない間だけ表示する
+    if "shifts" in st.session_state and st.session_state.get("shifts_text") == shift_text:
+        _render_results()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+"""
+土日祝日の判定（結果をプロセス内でキャッシュする）
+
+app.py は Streamlit の操作のたびに新しい名前空間で再実行されるため、そこで
+定義した lru_cache は再実行ごとに空になる。このモジュールは一度 import されると
+再実行されないため、判定結果を再実行をまたいで使い回せる。
+"""
+
+from datetime import date
+from functools import lru_cache
+
+# jpholiday は初回の祝日判定時に読み込む（起動時の import コストを避ける）
+_jpholiday = None
+
+
+@lru_cache(maxsize=4096)
+def is_holiday_or_weekend(ordinal: int) -> tuple[bool, str | None]:
+    """
+    土日祝日かどうかと祝日名をまとめて判定する（日付の序数をキーにキャッシュ）
+
+    Returns:
+        tuple: (土日祝日かどうか, 祝日名 または None)
+    """
+    global _jpholiday
+    if _jpholiday is None:
+        import jpholiday as _jpholiday
+    
+    target_date = date.fromordinal(ordinal)
+    holiday_name = _jpholiday.is_holiday_name(target_date)
+    # 土曜(5) または 日曜(6)、もしくは祝日
+    return target_date.weekday() >= 5 or holiday_name is not None, holiday_name
@@ -0,0 +1,57 @@
+"""
+給料計算ループ（numba があれば JIT コンパイルして使う）
+
+時間帯の区切りと時給の計算規則はこのループだけに書く。numba がなければ
+同じ関数をそのまま Python で実行する。
+
+app.py は Streamlit の操作のたびに再実行されるが、このモジュールは一度
+import されると再実行されないため、コンパイル済みの関数をプロセス内で使い回せる。
+numba の import とコンパイルは最初に get_kernel() を呼んだときに行う。
+"""
+
+# 未判定 / コンパイル済み関数 / Python のままの関数 のいずれか
+_UNSET = object()
+_kernel = _UNSET
+
+
+def _compute_wages_loop(
+    starts, ends, is_special, bounds, rates,
+    out_wage, out_morning, out_afternoon, out_evening,
+):
+    """
+    シフトごとの時間帯別の分数と給料を計算する
+    
+    bounds: (13:00, 17:00, 24:00) の境界（0:00からの分）
+    rates: (基本時給, 平日13:00〜17:00, 平日17:00以降, 土日祝日) の時給
+    結果は out_* の配列に書き込む
+    """
+    morning_end, afternoon_end, day_end = bounds
+    base_wage, afternoon_wage, evening_wage, weekend_wage = rates
+    for i in range(starts.size):
+        s = starts[i]
+        e = ends[i]
+        m = max(0, min(e, morning_end) - s)
+        a = max(0, min(e, afternoon_end) - max(s, morning_end))
+        v = max(0, min(e, day_end) - max(s, afternoon_end))
+        out_morning[i] = m
+        out_afternoon[i] = a
+        out_evening[i] = v
+        if is_special[i]:
+            out_wage[i] = (e - s) * weekend_wage // 60
+        else:
+            out_wage[i] = (m * base_wage + a * afternoon_wage + v * evening_wage) // 60
+
+
+def get_kernel():
+    """
+    計算ループを返す（numba があればコンパイル済み、なければ Python のまま）
+    """
+    global _kernel
+    if _kernel is _UNSET:
+        try:
+            from numba import njit
+        except ImportError:  # numba がなければコンパイルせずに使う
+            _kernel = _compute_wages_loop
+        else:
+            _kernel = njit(cache=True, boundscheck=False)(_compute_wages_loop)
+    return _kernel